@@ -13,6 +13,12 @@ DB_URL = os.getenv("DATABASE_URL", "sqlite:///stock_pipeline.db")  # fallback to
 LOG_DIR = "logs"
 LOG_FILE = "logs/pipeline.log"
 
+# Retention — cold data lives in Parquet files outside the database
+ARCHIVE_DIR = "data/archive"         # raw bars aged out of raw_stocks
+QUARANTINE_DIR = "data/quarantine"   # rejected records, one file per run, compacted monthly
+RAW_RETENTION_DAYS = 365             # raw bars older than this are archived
+MAINTENANCE_DAY = "sun"              # weekly archive / compaction / VACUUM run
+
 # Schedule — runs daily at 4:05 PM EST (after market close)
 SCHEDULE_HOUR = 16
 SCHEDULE_MINUTE = 5
@@ -20,3 +26,21 @@ SCHEDULE_MINUTE = 5
 # Data
 HISTORICAL_PERIOD = "6mo"   # how far back to fetch on first run
 INTERVAL = "1d"             # daily candles
+
+# Backfill — `python main.py --backfill`
+BACKFILL_YEARS = 10          # how far back a backfill reaches
+BACKFILL_WINDOW_DAYS = 365   # each (ticker, window) unit covers this many calendar days
+BACKFILL_WARMUP_DAYS = 60    # extra history fetched before each window so rolling features are exact
+BACKFILL_WORKERS = 4         # units fetched concurrently
+
+# Cross-sectional analytics — correlation, relative strength
+CROSS_SECTION_WINDOW = 60        # trading days in the rolling correlation window
+CROSS_SECTION_MIN_PERIODS = 20   # overlapping days needed before a pair gets a correlation
+RS_LOOKBACK = 20                 # trading days used for relative-strength returns
+SECTORS = {
+    "RELIANCE.NS": "Energy",
+    "TCS.NS": "IT",
+    "INFY.NS": "IT",
+    "HDFCBANK.NS": "Financials",
+    "WIPRO.NS": "IT",
+}
@@ -7,7 +7,8 @@ import io
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from streamlit_searchbox import st_searchbox
-from storage.db import load_processed, init_db
+from storage.db import load_processed, init_db, get_ticker_versions, load_relative_strength, get_analytics_version
+from processing.cross_section import refresh_cross_section, load_correlation, STATE_KEY
 
 # ── Page Config ─────────────────────────────────────────────
 st.set_page_config(
@@ -35,10 +36,15 @@ def get_nse_companies():
 # ── Load Pipeline Data ───────────────────────────────────────
 init_db()
 
-@st.cache_data(ttl=300)
+@st.cache_data(max_entries=1000)
+def load_ticker(ticker: str, version: int) -> pd.DataFrame:
+    # `version` is only part of the cache key — a new write bumps it and forces a reload
+    return load_processed(ticker)
+
+
 def get_data():
-    df = load_processed()
-    if df.empty:
+    versions = get_ticker_versions()
+    if not versions:
         # Auto-fetch on first run
         from ingestion.fetcher import fetch_all_stocks
         from processing.cleaner import clean
@@ -52,9 +58,27 @@ def get_data():
             processed_df = transform(valid_df)
             save_raw(raw)
             save_processed(processed_df)
-            return load_processed()
+            refresh_cross_section(processed_df)
+            versions = get_ticker_versions()
+    if not versions:
+        return pd.DataFrame()
+    return get_universe(tuple(sorted(versions.items())))
+
+
+@st.cache_resource(max_entries=2)
+def get_universe(versions: tuple) -> pd.DataFrame:
+    # One shared object per set of versions, so reruns with unchanged data skip the per-ticker
+    # cache entirely. Only tickers whose version changed hit the database. Never mutate the result.
+    df = pd.concat([load_ticker(ticker, version) for ticker, version in versions], ignore_index=True)
+    df["date"] = pd.to_datetime(df["date"])
     return df
 
+
+@st.cache_data(max_entries=10)
+def get_cross_section(state_version: int):
+    # Precomputed by the pipeline — every successful update bumps the analytics state version
+    return load_correlation(), load_relative_strength()
+
 # ── Title ────────────────────────────────────────────────────
 st.title("📈 Stock Market Data Pipeline")
 st.caption("Automated daily pipeline — NSE Stocks | Real-time data updated daily")
@@ -65,8 +89,6 @@ if df.empty:
     st.warning("No data yet. Run `python main.py --now` to load data.")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-
 # ── Sidebar ──────────────────────────────────────────────────
 st.sidebar.header("Filters")
 nse_companies = get_nse_companies()
@@ -118,8 +140,8 @@ if selected_company and new_ticker and st.sidebar.button(f"Fetch & Add {selected
                 processed_df = transform(valid_df)
                 save_raw(raw)
                 save_processed(processed_df)
+                refresh_cross_section(processed_df)
                 st.sidebar.success(f"✅ {selected_company} added!")
-                st.cache_data.clear()
                 st.rerun()
             else:
                 st.sidebar.error(f"❌ No data found.")
@@ -182,6 +204,30 @@ fig_v = px.bar(latest_all, x="display_name", y="volatility_7d", color="display_n
                title="7-Day Volatility (%)", template="plotly_dark")
 st.plotly_chart(fig_v, use_container_width=True)
 
+# ── Correlation Heatmap ──────────────────────────────────────
+corr, strength = get_cross_section(get_analytics_version(STATE_KEY))
+
+if not corr.empty:
+    st.subheader("Return Correlation — Rolling Window")
+    labels = [t.replace(".NS", "").replace(".BO", "") for t in corr.index]
+    fig_c = px.imshow(corr.values, x=labels, y=labels, zmin=-1, zmax=1,
+                      color_continuous_scale="RdBu_r", template="plotly_dark")
+    fig_c.update_layout(height=500)
+    st.plotly_chart(fig_c, use_container_width=True)
+
+# ── Relative Strength ────────────────────────────────────────
+if not strength.empty:
+    st.subheader("Relative Strength")
+    strength["display_name"] = strength["ticker"].str.replace(".NS", "").str.replace(".BO", "")
+    strength["sector_relative_pct"] = strength["sector_relative_return"] * 100
+    rs_col1, rs_col2 = st.columns(2)
+    fig_rs = px.bar(strength, x="display_name", y="rs_rank", color="sector",
+                    title="RS Rank (percentile of lookback return)", template="plotly_dark")
+    rs_col1.plotly_chart(fig_rs, use_container_width=True)
+    fig_sr = px.bar(strength.sort_values("sector_relative_pct"), x="display_name", y="sector_relative_pct",
+                    color="sector", title="Return vs Sector Average (%)", template="plotly_dark")
+    rs_col2.plotly_chart(fig_sr, use_container_width=True)
+
 # ── Daily % Change Table ─────────────────────────────────────
 st.subheader("Recent Daily % Changes")
 recent = df.sort_values("date").groupby("ticker").tail(7)[["date", "ticker", "close", "daily_pct_change"]].copy()
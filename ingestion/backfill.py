@@ -0,0 +1,131 @@
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from config import (STOCKS, BACKFILL_YEARS, BACKFILL_WINDOW_DAYS, BACKFILL_WARMUP_DAYS, BACKFILL_WORKERS,
+                    CROSS_SECTION_WINDOW)
+from ingestion.fetcher import fetch_stock_range
+from processing.cleaner import clean
+from processing.validator import validate
+from processing.transformer import transform
+from processing.cross_section import refresh_cross_section
+from storage.db import save_raw, save_processed, load_processed, plan_backfill, load_backfill_checkpoints, mark_backfill_unit
+from storage.quarantine import save_quarantine
+from utils.logger import get_logger
+
+logger = get_logger("ingestion.backfill")
+
+# SQLite allows a single writer — fetches run concurrently, writes are serialized
+_write_lock = threading.Lock()
+
+# Windows sit on a fixed grid from this date, so a rerun on a later day plans the same units
+_WINDOW_EPOCH = date(1970, 1, 1)
+
+
+def plan_windows(end: date, years: int = BACKFILL_YEARS, window_days: int = BACKFILL_WINDOW_DAYS) -> list:
+    """
+    Cover [end - years, end) with consecutive (start, end) windows, oldest first.
+    Window starts are multiples of window_days from a fixed epoch; only the newest
+    window is cut short at `end`. Window ends are exclusive.
+    """
+    start = end - timedelta(days=365 * years)
+    windows = []
+    cursor = _WINDOW_EPOCH + timedelta(days=(start - _WINDOW_EPOCH).days // window_days * window_days)
+    while cursor < end:
+        window_end = min(cursor + timedelta(days=window_days), end)
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows
+
+
+def run_unit(ticker: str, start: date, end: date, fetch=fetch_stock_range, run_id: str = "backfill") -> int:
+    """
+    Backfill one (ticker, window) unit through clean → validate → transform → store.
+    Fetches BACKFILL_WARMUP_DAYS of extra history so MAs and volatility at the start
+    of the window match a single full-history run; only rows inside the window are saved.
+    Marks the unit done once its rows are stored. Returns the number of bars in the window.
+    """
+    raw_df = fetch(ticker, start - timedelta(days=BACKFILL_WARMUP_DAYS), end)
+    if raw_df is None or raw_df.empty:
+        with _write_lock:
+            mark_backfill_unit(ticker, start, "done", rows=0)
+        return 0
+
+    clean_df = clean(raw_df)
+    valid_df, rejected_df = validate(clean_df)
+    processed_df = transform(valid_df)
+
+    window_start = pd.Timestamp(start)
+    raw_dates = pd.to_datetime(raw_df["date"]).dt.tz_localize(None).dt.normalize()
+    raw_in_window = raw_df[raw_dates >= window_start]
+    processed_in_window = processed_df[processed_df["date"] >= window_start] if not processed_df.empty else processed_df
+    rejected_in_window = rejected_df[rejected_df["date"] >= window_start] if not rejected_df.empty else rejected_df
+
+    with _write_lock:
+        save_raw(raw_in_window)
+        save_processed(processed_in_window)
+        save_quarantine(rejected_in_window, run_id)
+        # Checkpoint together with the writes, so an interrupted run never repeats this unit
+        mark_backfill_unit(ticker, start, "done", rows=len(raw_in_window))
+    return len(raw_in_window)
+
+
+def run_backfill(tickers: list = STOCKS, years: int = BACKFILL_YEARS, window_days: int = BACKFILL_WINDOW_DAYS,
+                 max_workers: int = BACKFILL_WORKERS, fetch=fetch_stock_range, end: date = None) -> dict:
+    """
+    Resumable historical backfill.
+    Every (ticker, window) unit is registered in backfill_checkpoints; units already
+    marked 'done' are skipped, so a crashed or interrupted run picks up where it left off,
+    even on a later day. Failed units are recorded and retried on the next run; the newest
+    window is re-run once `end` moves past where it was last cut.
+    Returns a summary {"done": n, "failed": n, "rows": n}.
+    """
+    end = end or date.today() + timedelta(days=1)
+    run_id = f"backfill_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    windows = plan_windows(end, years, window_days)
+    units = [(ticker, s, e) for ticker in tickers for s, e in windows]
+    plan_backfill(units)
+
+    # Only units of this plan — other tickers or older horizons may share the table
+    planned = {(ticker, s.isoformat()) for ticker, s, _ in units}
+    checkpoints = load_backfill_checkpoints()
+    in_plan = [(t, str(s)) in planned for t, s in zip(checkpoints["ticker"], checkpoints["window_start"])]
+    checkpoints = checkpoints[in_plan]
+    todo = checkpoints[checkpoints["status"] != "done"]
+    logger.info(f"Backfill: {len(todo)} of {len(checkpoints)} units remaining "
+                f"({len(tickers)} tickers × {len(windows)} windows, {max_workers} workers)")
+
+    summary = {"done": 0, "failed": 0, "rows": 0}
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {}
+        for row in todo.itertuples():
+            start = date.fromisoformat(str(row.window_start))
+            window_end = date.fromisoformat(str(row.window_end))
+            futures[pool.submit(run_unit, row.ticker, start, window_end, fetch, run_id)] = (row.ticker, start)
+
+        for future in as_completed(futures):
+            ticker, start = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                logger.error(f"Backfill unit {ticker} @ {start} failed: {e}")
+                with _write_lock:
+                    mark_backfill_unit(ticker, start, "failed", error=str(e))
+                summary["failed"] += 1
+                continue
+            summary["done"] += 1
+            summary["rows"] += rows
+    finally:
+        # On Ctrl+C or an error, drop queued units instead of running them all;
+        # units already in flight finish and checkpoint themselves
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    # Units finish out of order, so refresh cross-sectional analytics once from the stored tail
+    if summary["rows"]:
+        recent = load_processed(since=end - timedelta(days=CROSS_SECTION_WINDOW * 2))
+        refresh_cross_section(recent[recent["ticker"].isin(tickers)])
+
+    logger.info(f"Backfill finished — {summary['done']} units done, {summary['failed']} failed, "
+                f"{summary['rows']} rows written")
+    return summary
@@ -1,4 +1,5 @@
 import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError
 import pandas as pd
 from datetime import datetime
 from config import STOCKS, HISTORICAL_PERIOD, INTERVAL
@@ -21,17 +22,7 @@ def fetch_stock(ticker: str, period: str = HISTORICAL_PERIOD, interval: str = IN
             logger.warning(f"No data returned for {ticker}")
             return None
 
-        # Flatten and clean up column names
-        df = df.reset_index()
-        df.columns = [c.lower().replace(" ", "_") for c in df.columns]
-
-        # Add metadata
-        df["ticker"] = ticker
-        df["fetched_at"] = datetime.utcnow()
-
-        # Keep only the columns we need
-        df = df[["date", "ticker", "open", "high", "low", "close", "volume", "fetched_at"]]
-
+        df = _format(df, ticker)
         logger.info(f"Fetched {len(df)} rows for {ticker}")
         return df
 
@@ -40,6 +31,37 @@ def fetch_stock(ticker: str, period: str = HISTORICAL_PERIOD, interval: str = IN
         return None
 
 
+def fetch_stock_range(ticker: str, start, end, interval: str = INTERVAL) -> pd.DataFrame:
+    """
+    Fetch OHLCV data for a single ticker between start (inclusive) and end (exclusive).
+    Returns an empty DataFrame if the window has no bars (e.g. before listing).
+    Unlike fetch_stock, errors are raised so callers can record and retry the window —
+    yfinance otherwise swallows network and rate-limit errors and returns an empty frame.
+    """
+    logger.info(f"Fetching {ticker} from {start} to {end}...")
+    try:
+        df = yf.Ticker(ticker).history(start=start, end=end, interval=interval, raise_errors=True)
+    except YFPricesMissingError:
+        # Yahoo answered, but has no bars for this window
+        return pd.DataFrame()
+    if df.empty:
+        return pd.DataFrame()
+    return _format(df, ticker)
+
+
+def _format(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    # Flatten and clean up column names
+    df = df.reset_index()
+    df.columns = [c.lower().replace(" ", "_") for c in df.columns]
+
+    # Add metadata
+    df["ticker"] = ticker
+    df["fetched_at"] = datetime.utcnow()
+
+    # Keep only the columns we need
+    return df[["date", "ticker", "open", "high", "low", "close", "volume", "fetched_at"]]
+
+
 def fetch_all_stocks(tickers: list = STOCKS) -> pd.DataFrame:
     """
     Fetch data for all configured tickers and combine into one DataFrame.
@@ -6,9 +6,12 @@ from ingestion.fetcher import fetch_all_stocks
 from processing.cleaner import clean
 from processing.validator import validate
 from processing.transformer import transform
-from storage.db import init_db, save_raw, save_processed
+from processing.cross_section import refresh_cross_section
+from storage.db import init_db, save_raw, save_processed, vacuum_analyze
+from storage.archive import archive_raw
+from storage.quarantine import save_quarantine, compact_quarantine, import_rejected_csvs
 from utils.logger import get_logger
-from config import SCHEDULE_HOUR, SCHEDULE_MINUTE
+from config import SCHEDULE_HOUR, SCHEDULE_MINUTE, MAINTENANCE_DAY
 from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime
 
@@ -24,9 +27,11 @@ def run_pipeline():
     4. Validate
     5. Transform (feature engineering)
     6. Save processed data
+    7. Update cross-sectional analytics (correlation, relative strength) — a failure here is logged, not fatal
     """
+    run_id = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     logger.info("=" * 50)
-    logger.info(f"Pipeline started at {datetime.utcnow()}")
+    logger.info(f"Pipeline started at {datetime.utcnow()} (run {run_id})")
 
     try:
         # Step 1: Fetch
@@ -43,8 +48,7 @@ def run_pipeline():
 
         # Step 4: Validate
         valid_df, rejected_df = validate(clean_df)
-        if not rejected_df.empty:
-            rejected_df.to_csv(f"logs/rejected_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv", index=False)
+        save_quarantine(rejected_df, run_id)
 
         # Step 5: Transform
         processed_df = transform(valid_df)
@@ -52,6 +56,9 @@ def run_pipeline():
         # Step 6: Save processed
         save_processed(processed_df)
 
+        # Step 7: Cross-sectional analytics
+        refresh_cross_section(processed_df)
+
         logger.info(f"Pipeline completed successfully at {datetime.utcnow()}")
         logger.info("=" * 50)
 
@@ -59,6 +66,29 @@ def run_pipeline():
         logger.error(f"Pipeline failed: {e}", exc_info=True)
 
 
+def run_maintenance():
+    """
+    Keep the hot tables small:
+    1. Archive old raw bars to Parquet
+    2. Move legacy rejected CSVs into the quarantine store
+    3. Compact last months' quarantine files
+    4. VACUUM / ANALYZE
+    Steps are independent — a failing step is logged and the rest still run.
+    Returns the names of the steps that failed.
+    """
+    logger.info(f"Maintenance started at {datetime.utcnow()}")
+    failed = []
+    for step in (archive_raw, import_rejected_csvs, compact_quarantine, vacuum_analyze):
+        try:
+            step()
+        except Exception as e:
+            logger.error(f"Maintenance step {step.__name__} failed: {e}", exc_info=True)
+            failed.append(step.__name__)
+    logger.info(f"Maintenance completed at {datetime.utcnow()}"
+                + (f" — failed steps: {', '.join(failed)}" if failed else ""))
+    return failed
+
+
 if __name__ == "__main__":
     # Initialize DB on first run
     init_db()
@@ -67,12 +97,21 @@ if __name__ == "__main__":
     if "--now" in sys.argv:
         # Run once immediately (for testing)
         run_pipeline()
+    elif "--backfill" in sys.argv:
+        # Load multi-year history in resumable (ticker, window) units
+        from ingestion.backfill import run_backfill
+        run_backfill()
+    elif "--maintenance" in sys.argv:
+        run_maintenance()
     else:
         # Schedule daily run
         scheduler = BlockingScheduler(timezone="America/New_York")
         scheduler.add_job(run_pipeline, "cron", hour=SCHEDULE_HOUR, minute=SCHEDULE_MINUTE)
+        # Weekly, after the daily run has finished
+        scheduler.add_job(run_maintenance, "cron", day_of_week=MAINTENANCE_DAY, hour=SCHEDULE_HOUR + 1)
         logger.info(f"Scheduler started — pipeline runs daily at {SCHEDULE_HOUR}:{SCHEDULE_MINUTE:02d} EST")
         logger.info("Run 'python main.py --now' to trigger immediately")
+        logger.info("Run 'python main.py --backfill' to load multi-year history")
         try:
             scheduler.start()
         except (KeyboardInterrupt, SystemExit):
@@ -0,0 +1,206 @@
+import io
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+from config import CROSS_SECTION_WINDOW, CROSS_SECTION_MIN_PERIODS, RS_LOOKBACK, SECTORS
+from storage.db import swap_analytics, load_analytics, load_analytics_version
+from utils.logger import get_logger
+
+logger = get_logger("processing.cross_section")
+
+STATE_KEY = "rolling_correlation_state"
+CORRELATION_KEY = "correlation"
+MAX_SWAP_ATTEMPTS = 5   # the scheduler, a backfill and the dashboard may all update the state
+
+
+class RollingCorrelation:
+    """
+    Pairwise rolling correlation of daily returns across the whole universe.
+
+    Keeps the last `window` dates of returns plus running pairwise sums
+    (counts, Σx, Σx², Σxy), so a new bar costs O(N²) instead of recomputing
+    N×N correlations from full history. Missing returns are NaN and are
+    excluded pairwise, like DataFrame.corr().
+    """
+
+    def __init__(self, window: int = CROSS_SECTION_WINDOW):
+        self.window = window
+        self.tickers = []
+        self.dates = []                 # sorted, one entry per row in self.rows
+        self.rows = np.empty((0, 0))    # returns, dates × tickers
+        self.n = np.zeros((0, 0))       # n[i, j]   = #days both i and j have a return
+        self.sx = np.zeros((0, 0))      # sx[i, j]  = Σ x_i   over those days
+        self.sxx = np.zeros((0, 0))     # sxx[i, j] = Σ x_i²  over those days
+        self.sxy = np.zeros((0, 0))     # sxy[i, j] = Σ x_i·x_j
+
+    def update(self, returns: pd.DataFrame):
+        """
+        Fold a (date × ticker) frame of returns into the window.
+        New dates are appended (evicting the oldest), dates already in the window
+        are patched in place, and dates older than a full window are ignored.
+        """
+        self._expand([t for t in returns.columns if t not in self.tickers])
+        returns = returns.reindex(columns=self.tickers).sort_index()
+
+        for date, values in returns.iterrows():
+            vec = values.to_numpy(dtype=float)
+            if np.isnan(vec).all():
+                continue
+            if len(self.dates) >= self.window and date < self.dates[0]:
+                continue
+
+            pos = bisect_left(self.dates, date)
+            if pos < len(self.dates) and self.dates[pos] == date:
+                old = self.rows[pos]
+                new = np.where(np.isnan(vec), old, vec)
+                if np.array_equal(old, new, equal_nan=True):
+                    continue
+                self._accumulate(old, -1)
+                self._accumulate(new, 1)
+                self.rows[pos] = new
+            else:
+                self.dates.insert(pos, date)
+                self.rows = np.insert(self.rows, pos, vec, axis=0)
+                self._accumulate(vec, 1)
+                if len(self.dates) > self.window:
+                    self._accumulate(self.rows[0], -1)
+                    self.rows = self.rows[1:]
+                    del self.dates[0]
+
+    def correlation(self, min_periods: int = CROSS_SECTION_MIN_PERIODS) -> pd.DataFrame:
+        """Return the current N×N correlation matrix (NaN where a pair has too little overlap)."""
+        n, sx, sxx = self.n, self.sx, self.sxx
+        cov = n * self.sxy - sx * sx.T
+        var = n * sxx - sx ** 2
+        denom = var * var.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = np.where(denom > 0, cov / np.sqrt(np.where(denom > 0, denom, 1)), np.nan)
+        corr[n < min_periods] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.tickers, columns=self.tickers)
+
+    def period_returns(self, lookback: int = RS_LOOKBACK) -> pd.Series:
+        """Compounded return over the last `lookback` dates; NaN if a ticker misses more than half of them."""
+        recent = self.rows[-lookback:]
+        observed = (~np.isnan(recent)).sum(axis=0)
+        compounded = np.nanprod(1 + recent, axis=0) - 1
+        compounded[observed < max(1, min(lookback, len(recent)) / 2)] = np.nan
+        return pd.Series(compounded, index=self.tickers)
+
+    def _accumulate(self, vec: np.ndarray, sign: int):
+        present = (~np.isnan(vec)).astype(float)
+        x = np.nan_to_num(vec)
+        self.n += sign * np.outer(present, present)
+        self.sx += sign * np.outer(x, present)
+        self.sxx += sign * np.outer(x * x, present)
+        self.sxy += sign * np.outer(x, x)
+
+    def _expand(self, new_tickers: list):
+        if not new_tickers:
+            return
+        k = len(new_tickers)
+        self.tickers = self.tickers + list(new_tickers)
+        self.rows = np.pad(self.rows, ((0, 0), (0, k)), constant_values=np.nan)
+        for name in ("n", "sx", "sxx", "sxy"):
+            setattr(self, name, np.pad(getattr(self, name), ((0, k), (0, k))))
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf, window=self.window, tickers=np.array(self.tickers, dtype=str),
+            dates=np.array(self.dates, dtype="datetime64[ns]"), rows=self.rows,
+            n=self.n, sx=self.sx, sxx=self.sxx, sxy=self.sxy,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "RollingCorrelation":
+        data = np.load(io.BytesIO(payload))
+        state = cls(int(data["window"]))
+        state.tickers = data["tickers"].tolist()
+        state.dates = [pd.Timestamp(d) for d in data["dates"]]
+        for name in ("rows", "n", "sx", "sxx", "sxy"):
+            setattr(state, name, data[name])
+        return state
+
+
+def update_cross_section(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cross-sectional stage — runs once the transformed rows are saved.
+    Folds the batch's daily returns into the stored rolling correlation state,
+    then stores the correlation matrix and per-ticker relative strength:
+    - period_return: compounded return over RS_LOOKBACK days
+    - sector_relative_return: period_return minus the sector average
+    - rs_rank: percentile rank of period_return across the universe (0-100)
+    Returns the relative-strength rows.
+    """
+    if df.empty:
+        logger.warning("Empty DataFrame — skipping cross-sectional update.")
+        return pd.DataFrame()
+
+    returns = df.pivot_table(index="date", columns="ticker", values="daily_pct_change", aggfunc="last") / 100
+    returns.index = pd.to_datetime(returns.index)
+
+    # Optimistic concurrency: fold the batch into the latest state and swap it in only if
+    # nobody else wrote in the meantime — otherwise reload and fold again
+    for attempt in range(1, MAX_SWAP_ATTEMPTS + 1):
+        payload, version = load_analytics_version(STATE_KEY)
+        state = RollingCorrelation.from_bytes(payload) if payload else RollingCorrelation()
+        state.update(returns)
+        if not state.dates:
+            logger.warning("No returns in the rolling window — skipping cross-sectional update.")
+            return pd.DataFrame()
+
+        strength = _relative_strength(state)
+        derived = {CORRELATION_KEY: _correlation_to_bytes(state.correlation())}
+        if swap_analytics(STATE_KEY, state.to_bytes(), version, derived, strength):
+            break
+        logger.warning(f"Cross-section state changed concurrently — retrying ({attempt}/{MAX_SWAP_ATTEMPTS})")
+    else:
+        raise RuntimeError(f"Cross-section update lost {MAX_SWAP_ATTEMPTS} races for the shared state")
+
+    logger.info(f"Cross-section updated — {len(state.tickers)} tickers, "
+                f"{len(state.dates)} days in window ending {state.dates[-1].date()}")
+    return strength
+
+
+def refresh_cross_section(df: pd.DataFrame) -> bool:
+    """
+    Run update_cross_section as an optional stage, after the processed rows are saved.
+    A failure is logged rather than raised — the saved data stays, and the next run
+    folds the same dates in again. Returns True on success.
+    """
+    try:
+        update_cross_section(df)
+        return True
+    except Exception as e:
+        logger.error(f"Cross-sectional update failed — processed data is saved, analytics are stale: {e}",
+                     exc_info=True)
+        return False
+
+
+def _relative_strength(state: RollingCorrelation) -> pd.DataFrame:
+    strength = state.period_returns().rename("period_return").to_frame()
+    strength["ticker"] = strength.index
+    strength["sector"] = strength["ticker"].map(SECTORS).fillna("Other")
+    sector_mean = strength.groupby("sector")["period_return"].transform("mean")
+    strength["sector_relative_return"] = strength["period_return"] - sector_mean
+    strength["rs_rank"] = strength["period_return"].rank(pct=True).mul(100)
+    strength["date"] = state.dates[-1]
+    return strength.dropna(subset=["period_return"]).reset_index(drop=True)
+
+
+def load_correlation() -> pd.DataFrame:
+    """Load the stored correlation matrix, or an empty DataFrame if none exists yet."""
+    payload = load_analytics(CORRELATION_KEY)
+    if payload is None:
+        return pd.DataFrame()
+    data = np.load(io.BytesIO(payload))
+    tickers = data["tickers"].tolist()
+    return pd.DataFrame(data["corr"].astype(float), index=tickers, columns=tickers)
+
+
+def _correlation_to_bytes(corr: pd.DataFrame) -> bytes:
+    # float32 halves the size; plenty of precision for a heatmap
+    buf = io.BytesIO()
+    np.savez_compressed(buf, tickers=np.array(corr.index, dtype=str), corr=corr.to_numpy(dtype=np.float32))
+    return buf.getvalue()
@@ -0,0 +1,74 @@
+import os
+from datetime import date, timedelta
+import pandas as pd
+from config import ARCHIVE_DIR, RAW_RETENTION_DAYS
+from storage.db import load_raw, delete_raw_before, max_raw_id
+from utils.logger import get_logger
+
+logger = get_logger("storage.archive")
+
+# One zstd-compressed Parquet file per calendar month: <archive_dir>/raw_stocks/month=YYYY-MM/data.parquet
+
+
+def archive_raw(retention_days: int = RAW_RETENTION_DAYS, archive_dir: str = ARCHIVE_DIR) -> int:
+    """
+    Move raw bars older than retention_days out of raw_stocks into monthly archive partitions.
+    Partitions are merged and deduplicated on rewrite, so an interrupted run is safe to repeat.
+    Returns the number of rows archived.
+    """
+    cutoff = date.today() - timedelta(days=retention_days)
+    # Ids only grow, so every old row with id <= max_id is in the read below; anything a
+    # concurrent writer (e.g. a backfill) adds later stays in raw_stocks until the next run
+    max_id = max_raw_id()
+    old = load_raw(until=cutoff, include_archive=False)
+    if old.empty:
+        logger.info(f"No raw bars older than {cutoff} — nothing to archive.")
+        return 0
+
+    months = old["date"].dt.strftime("%Y-%m")
+    for month, part in old.groupby(months):
+        path = _partition_path(archive_dir, month)
+        if os.path.exists(path):
+            part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+        part = part.drop_duplicates(["date", "ticker"], keep="last").sort_values(["ticker", "date"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and swap, so readers never see a half-written partition
+        part.to_parquet(path + ".tmp", index=False, compression="zstd")
+        os.replace(path + ".tmp", path)
+
+    # Only delete once every partition is safely on disk, and only rows that were read
+    deleted = delete_raw_before(cutoff, max_id)
+    logger.info(f"Archived {len(old)} raw bars older than {cutoff} into {months.nunique()} partition(s); "
+                f"removed {deleted} rows from 'raw_stocks'")
+    return len(old)
+
+
+def read_archive(ticker: str = None, since=None, until=None, archive_dir: str = ARCHIVE_DIR) -> pd.DataFrame:
+    """Read archived raw bars in [since, until), touching only the monthly partitions in range."""
+    root = os.path.join(archive_dir, "raw_stocks")
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+
+    first = pd.Timestamp(since).strftime("%Y-%m") if since else None
+    last = pd.Timestamp(until).strftime("%Y-%m") if until else None
+    filters = [("ticker", "=", ticker)] if ticker else None
+    frames = []
+    for entry in sorted(os.listdir(root)):
+        month = entry.removeprefix("month=")
+        path = _partition_path(archive_dir, month)
+        if (first and month < first) or (last and month > last) or not os.path.exists(path):
+            continue
+        frames.append(pd.read_parquet(path, filters=filters))
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if since:
+        df = df[df["date"] >= pd.Timestamp(since)]
+    if until:
+        df = df[df["date"] < pd.Timestamp(until)]
+    return df.reset_index(drop=True)
+
+
+def _partition_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, "raw_stocks", f"month={month}", "data.parquet")
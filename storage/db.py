@@ -1,4 +1,5 @@
 import pandas as pd
+from datetime import datetime
 from sqlalchemy import create_engine, text
 from config import DB_URL
 from utils.logger import get_logger
@@ -43,6 +44,73 @@ def init_db():
                 UNIQUE(date, ticker)
             )
         """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS ticker_versions (
+                ticker TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+                ticker TEXT NOT NULL,
+                window_start DATE NOT NULL,
+                window_end DATE NOT NULL,
+                status TEXT NOT NULL,
+                rows INTEGER,
+                error TEXT,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (ticker, window_start)
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS analytics_state (
+                name TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS relative_strength (
+                date DATE NOT NULL,
+                ticker TEXT NOT NULL,
+                sector TEXT,
+                period_return REAL,
+                sector_relative_return REAL,
+                rs_rank REAL,
+                UNIQUE(date, ticker)
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS quarantine_index (
+                run_id TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                created_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quarantine_run ON quarantine_index (run_id)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quarantine_ticker ON quarantine_index (ticker)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_quarantine_reason ON quarantine_index (reason)"))
+        # One row per quarantined (ticker, date, reason), so a reject seen again is not stored twice
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS quarantine_keys (
+                ticker TEXT NOT NULL,
+                date TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                PRIMARY KEY (ticker, date, reason)
+            )
+        """))
+        # One-time seed for tickers written before version tracking existed. Once any version
+        # exists, save_processed keeps them complete — skip the full scan (init_db runs per page load)
+        if conn.execute(text("SELECT 1 FROM ticker_versions LIMIT 1")).first() is None:
+            conn.execute(text("""
+                INSERT OR IGNORE INTO ticker_versions (ticker, version, updated_at)
+                SELECT DISTINCT ticker, 1, CURRENT_TIMESTAMP FROM processed_stocks
+            """))
         conn.commit()
     logger.info("Database initialized.")
 
@@ -55,40 +123,299 @@ def save_raw(df: pd.DataFrame):
 
 
 def save_processed(df: pd.DataFrame):
-    """Insert processed stock data — skip duplicates."""
+    """Insert processed stock data — skip duplicates. Rows and version bumps commit together."""
     if df.empty:
         return
     cols = ["date", "ticker", "open", "high", "low", "close", "volume",
             "ma_7", "ma_30", "daily_pct_change", "volatility_7d", "above_ma30"]
-    _upsert(df[cols], "processed_stocks")
+    with engine.connect() as conn:
+        inserted = _upsert(df[cols], "processed_stocks", conn=conn)
+        _bump_versions(conn, [t for t, n in inserted.items() if n > 0])
+        conn.commit()
+
+
+def _bump_versions(conn, tickers: list):
+    """Advance the write watermark for every ticker that received new rows (caller commits)."""
+    if not tickers:
+        return
+    now = datetime.utcnow().isoformat()
+    for ticker in tickers:
+        conn.execute(text("""
+            INSERT INTO ticker_versions (ticker, version, updated_at)
+            VALUES (:ticker, 1, :now)
+            ON CONFLICT(ticker) DO UPDATE SET version = version + 1, updated_at = :now
+        """), {"ticker": ticker, "now": now})
+    logger.info(f"Bumped data version for {len(tickers)} ticker(s): {tickers}")
+
+
+def get_ticker_versions() -> dict:
+    """
+    Return {ticker: version} for every ticker in processed_stocks.
+    The version only changes when save_processed inserts new rows for that ticker,
+    so callers can use it as a cheap cache key.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT ticker, version FROM ticker_versions ORDER BY ticker")).fetchall()
+    return {ticker: version for ticker, version in rows}
 
-def _upsert(df: pd.DataFrame, table: str):
-    inserted = 0
+def swap_analytics(name: str, payload: bytes, expected_version: int, derived: dict = None,
+                   relative_strength: pd.DataFrame = None) -> bool:
+    """
+    Compare-and-swap the analytics object `name`: store `payload` only if its version is
+    still `expected_version` (0 = not stored yet). Results derived from it — other named
+    payloads and relative-strength rows — are written in the same transaction.
+    Returns False, writing nothing, if another writer got there first.
+    """
+    now = datetime.utcnow().isoformat()
+    params = {"name": name, "payload": payload, "expected": expected_version, "now": now}
     with engine.connect() as conn:
-        for _, row in df.iterrows():
-            # Convert row to plain Python types — SQLite can't handle pandas Timestamps
-            row_dict = {}
-            for k, v in row.items():
-                if hasattr(v, 'tzinfo') and v.tzinfo is not None:
-                    # Strip timezone from datetime
-                    row_dict[k] = v.tz_localize(None).isoformat() if hasattr(v, 'tz_localize') else v.replace(tzinfo=None).isoformat()
-                elif hasattr(v, 'isoformat'):
-                    row_dict[k] = v.isoformat()
-                else:
-                    row_dict[k] = v
-
-            cols = ", ".join(row_dict.keys())
-            placeholders = ", ".join([f":{c}" for c in row_dict.keys()])
-            stmt = text(f"INSERT OR IGNORE INTO {table} ({cols}) VALUES ({placeholders})")
-            result = conn.execute(stmt, row_dict)
-            inserted += result.rowcount
+        if expected_version == 0:
+            result = conn.execute(text("""
+                INSERT OR IGNORE INTO analytics_state (name, payload, version, updated_at)
+                VALUES (:name, :payload, 1, :now)
+            """), params)
+        else:
+            result = conn.execute(text("""
+                UPDATE analytics_state SET payload = :payload, version = version + 1, updated_at = :now
+                WHERE name = :name AND version = :expected
+            """), params)
+        if result.rowcount != 1:
+            conn.rollback()
+            return False
+
+        for derived_name, derived_payload in (derived or {}).items():
+            conn.execute(text("""
+                INSERT OR REPLACE INTO analytics_state (name, payload, updated_at)
+                VALUES (:name, :payload, :now)
+            """), {"name": derived_name, "payload": derived_payload, "now": now})
+        if relative_strength is not None and not relative_strength.empty:
+            cols = ["date", "ticker", "sector", "period_return", "sector_relative_return", "rs_rank"]
+            _upsert(relative_strength[cols], "relative_strength", conflict="REPLACE", conn=conn)
         conn.commit()
-    logger.info(f"Saved {inserted} new rows to '{table}' (skipped {len(df) - inserted} duplicates)")
+    return True
+
+
+def load_analytics(name: str) -> bytes | None:
+    """Return the payload stored under `name`, or None if it hasn't been computed yet."""
+    return load_analytics_version(name)[0]
+
+
+def get_analytics_version(name: str) -> int:
+    """Return the version of `name` without loading its payload (0 if it hasn't been computed yet)."""
+    with engine.connect() as conn:
+        version = conn.execute(text("SELECT version FROM analytics_state WHERE name = :name"),
+                               {"name": name}).scalar()
+    return version or 0
+
+
+def load_analytics_version(name: str) -> tuple:
+    """Return (payload, version) for `name` — (None, 0) if it hasn't been computed yet."""
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT payload, version FROM analytics_state WHERE name = :name"),
+                           {"name": name}).fetchone()
+    return (bytes(row[0]), row[1]) if row else (None, 0)
+
 
-def load_processed(ticker: str = None) -> pd.DataFrame:
-    """Load processed data, optionally filtered by ticker."""
-    query = "SELECT * FROM processed_stocks"
+def _upsert(df: pd.DataFrame, table: str, conflict: str = "IGNORE", conn=None) -> dict:
+    """
+    Insert rows, resolving duplicates with INSERT OR <conflict>. Returns {ticker: rows_written}.
+    Commits on its own connection unless an open `conn` is passed in.
+    """
+    if conn is None:
+        with engine.connect() as conn:
+            inserted = _upsert(df, table, conflict, conn)
+            conn.commit()
+        return inserted
+
+    inserted = {}
+    for _, row in df.iterrows():
+        # Convert row to plain Python types — SQLite can't handle pandas Timestamps
+        row_dict = {}
+        for k, v in row.items():
+            if hasattr(v, 'tzinfo') and v.tzinfo is not None:
+                # Strip timezone from datetime
+                row_dict[k] = v.tz_localize(None).isoformat() if hasattr(v, 'tz_localize') else v.replace(tzinfo=None).isoformat()
+            elif hasattr(v, 'isoformat'):
+                row_dict[k] = v.isoformat()
+            else:
+                row_dict[k] = v
+
+        cols = ", ".join(row_dict.keys())
+        placeholders = ", ".join([f":{c}" for c in row_dict.keys()])
+        stmt = text(f"INSERT OR {conflict} INTO {table} ({cols}) VALUES ({placeholders})")
+        result = conn.execute(stmt, row_dict)
+        inserted[row_dict["ticker"]] = inserted.get(row_dict["ticker"], 0) + result.rowcount
+    total = sum(inserted.values())
+    logger.info(f"Saved {total} new rows to '{table}' (skipped {len(df) - total} duplicates)")
+    return inserted
+
+def load_processed(ticker: str = None, since=None) -> pd.DataFrame:
+    """Load processed data, optionally filtered by ticker and/or a minimum date."""
+    query = "SELECT * FROM processed_stocks WHERE 1 = 1"
+    params = {}
     if ticker:
-        query += f" WHERE ticker = '{ticker}'"
+        query += " AND ticker = :ticker"
+        params["ticker"] = ticker
+    if since:
+        query += " AND date >= :since"
+        params["since"] = since.isoformat()
     query += " ORDER BY ticker, date"
-    return pd.read_sql(query, engine)
+    return pd.read_sql(text(query), engine, params=params)
+
+
+def load_raw(ticker: str = None, since=None, until=None, include_archive: bool = True) -> pd.DataFrame:
+    """
+    Load raw bars in [since, until), optionally filtered by ticker.
+    Bars aged out of raw_stocks are read back from the archive, so callers
+    see one continuous history.
+    """
+    query = "SELECT date, ticker, open, high, low, close, volume, fetched_at FROM raw_stocks WHERE 1 = 1"
+    params = {}
+    if ticker:
+        query += " AND ticker = :ticker"
+        params["ticker"] = ticker
+    if since:
+        query += " AND date >= :since"
+        params["since"] = since.isoformat()
+    if until:
+        query += " AND date < :until"
+        params["until"] = until.isoformat()
+    df = pd.read_sql(text(query), engine, params=params)
+    df["date"] = pd.to_datetime(df["date"])
+    if include_archive:
+        from storage.archive import read_archive
+        archived = read_archive(ticker, since, until)
+        if not archived.empty:
+            df = pd.concat([archived, df], ignore_index=True).drop_duplicates(["date", "ticker"], keep="last")
+    return df.sort_values(["ticker", "date"]).reset_index(drop=True)
+
+
+def max_raw_id() -> int:
+    """Return the highest raw_stocks id (0 if empty) — a high-water mark for rows written so far."""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM raw_stocks")).scalar()
+
+
+def delete_raw_before(cutoff, max_id: int) -> int:
+    """
+    Delete raw bars dated before cutoff with id <= max_id. Rows written after the
+    high-water mark was taken are left alone. Returns the number of rows removed.
+    """
+    with engine.connect() as conn:
+        result = conn.execute(text("DELETE FROM raw_stocks WHERE date < :cutoff AND id <= :max_id"),
+                              {"cutoff": cutoff.isoformat(), "max_id": max_id})
+        conn.commit()
+    return result.rowcount
+
+
+def add_quarantine_index(entries: pd.DataFrame, keys: pd.DataFrame = None):
+    """
+    Register (run_id, ticker, reason, rows, path) entries for a quarantine file, together
+    with the (ticker, date, reason) keys of the records it holds, in one transaction.
+    """
+    now = datetime.utcnow().isoformat()
+    with engine.connect() as conn:
+        for entry in entries.to_dict("records"):
+            conn.execute(text("""
+                INSERT INTO quarantine_index (run_id, ticker, reason, rows, path, created_at)
+                VALUES (:run_id, :ticker, :reason, :rows, :path, :now)
+            """), {**entry, "rows": int(entry["rows"]), "now": now})
+        if keys is not None:
+            for key in keys.to_dict("records"):
+                conn.execute(text("""
+                    INSERT OR IGNORE INTO quarantine_keys (ticker, date, reason)
+                    VALUES (:ticker, :date, :reason)
+                """), key)
+        conn.commit()
+
+
+def load_quarantine_keys(tickers: list) -> set:
+    """Return the (ticker, date, reason) keys already quarantined for the given tickers."""
+    keys = set()
+    with engine.connect() as conn:
+        for ticker in tickers:
+            rows = conn.execute(text("SELECT ticker, date, reason FROM quarantine_keys WHERE ticker = :ticker"),
+                                {"ticker": ticker}).fetchall()
+            keys.update(tuple(row) for row in rows)
+    return keys
+
+
+def find_quarantine_files(run_id: str = None, ticker: str = None, reason: str = None) -> list:
+    """Return quarantine file paths holding records that match every given filter."""
+    query = "SELECT DISTINCT path FROM quarantine_index WHERE 1 = 1"
+    params = {}
+    for col, value in (("run_id", run_id), ("ticker", ticker), ("reason", reason)):
+        if value:
+            query += f" AND {col} = :{col}"
+            params[col] = value
+    with engine.connect() as conn:
+        rows = conn.execute(text(query + " ORDER BY path"), params).fetchall()
+    return [row[0] for row in rows]
+
+
+def repoint_quarantine_index(old_paths: list, new_path: str):
+    """Point index entries at a compacted file after its source files were merged."""
+    with engine.connect() as conn:
+        for path in old_paths:
+            conn.execute(text("UPDATE quarantine_index SET path = :new WHERE path = :old"),
+                         {"new": new_path, "old": path})
+        conn.commit()
+
+
+def vacuum_analyze():
+    """Refresh planner statistics and reclaim space freed by deletes."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+        conn.execute(text("VACUUM"))
+    logger.info("Database VACUUM/ANALYZE complete.")
+
+
+def load_relative_strength() -> pd.DataFrame:
+    """Load relative-strength rows for the most recent date."""
+    query = """
+        SELECT * FROM relative_strength
+        WHERE date = (SELECT MAX(date) FROM relative_strength)
+        ORDER BY rs_rank DESC
+    """
+    return pd.read_sql(text(query), engine)
+
+
+def plan_backfill(units: list):
+    """
+    Register (ticker, window_start, window_end) units as pending. Already known units keep
+    their status, unless the plan now reaches past their window_end — then they are re-queued.
+    """
+    now = datetime.utcnow().isoformat()
+    with engine.connect() as conn:
+        for ticker, start, end in units:
+            conn.execute(text("""
+                INSERT INTO backfill_checkpoints (ticker, window_start, window_end, status, updated_at)
+                VALUES (:ticker, :start, :end, 'pending', :now)
+                ON CONFLICT(ticker, window_start) DO UPDATE
+                SET window_end = excluded.window_end, status = 'pending', updated_at = excluded.updated_at
+                WHERE excluded.window_end > backfill_checkpoints.window_end
+            """), {"ticker": ticker, "start": start.isoformat(), "end": end.isoformat(), "now": now})
+        conn.commit()
+
+
+def load_backfill_checkpoints(status: str = None) -> pd.DataFrame:
+    """Load backfill progress, optionally filtered by status ('pending', 'done', 'failed')."""
+    query = "SELECT * FROM backfill_checkpoints"
+    params = {}
+    if status:
+        query += " WHERE status = :status"
+        params["status"] = status
+    query += " ORDER BY ticker, window_start"
+    return pd.read_sql(text(query), engine, params=params)
+
+
+def mark_backfill_unit(ticker: str, start, status: str, rows: int = 0, error: str = None):
+    """Record the outcome of one backfill unit."""
+    with engine.connect() as conn:
+        conn.execute(text("""
+            UPDATE backfill_checkpoints
+            SET status = :status, rows = :rows, error = :error, updated_at = :now
+            WHERE ticker = :ticker AND window_start = :start
+        """), {"ticker": ticker, "start": start.isoformat(), "status": status, "rows": rows,
+               "error": error, "now": datetime.utcnow().isoformat()})
+        conn.commit()
@@ -0,0 +1,155 @@
+import glob
+import os
+import uuid
+from datetime import datetime
+import pandas as pd
+from config import QUARANTINE_DIR, LOG_DIR
+from storage.db import add_quarantine_index, find_quarantine_files, repoint_quarantine_index, load_quarantine_keys
+from utils.logger import get_logger
+
+logger = get_logger("storage.quarantine")
+
+# Store for rejected records: runs only ever add a new Parquet file under
+# <quarantine_dir>/month=YYYY-MM/, with a (run_id, ticker, reason) → file index in the DB.
+# Compaction later folds a closed month's files into month=YYYY-MM/compacted.parquet,
+# whose rows keep the path of the file they came from in `source_file`.
+# Each (ticker, date, reason) is stored once: a reject seen again by a later run is skipped.
+COMPACTED = "compacted.parquet"
+COLUMNS = ["run_id", "ticker", "date", "open", "high", "low", "close", "volume", "rejection_reason", "quarantined_at"]
+
+
+def save_quarantine(rejected_df: pd.DataFrame, run_id: str, quarantine_dir: str = QUARANTINE_DIR,
+                    month: str = None) -> int:
+    """
+    Append validator rejects to the quarantine store, under `month` (YYYY-MM, default: current month).
+    Records with several reasons are split into one row per reason so each reason is queryable;
+    (ticker, date, reason) rows already in the store are dropped.
+    Returns the number of rows written.
+    """
+    if rejected_df.empty:
+        return 0
+
+    df = rejected_df.copy()
+    df["run_id"] = run_id
+    df["quarantined_at"] = datetime.utcnow()
+    df["rejection_reason"] = df["rejection_reason"].str.split("; ")
+    df = df.explode("rejection_reason")
+    df = _normalize(df).sort_values(["ticker", "rejection_reason", "date"]).reset_index(drop=True)
+
+    keys = pd.DataFrame({"ticker": df["ticker"], "date": df["date"].dt.strftime("%Y-%m-%d"),
+                         "reason": df["rejection_reason"]})
+    known = load_quarantine_keys(keys["ticker"].unique().tolist())
+    fresh = pd.Series([key not in known for key in zip(keys["ticker"], keys["date"], keys["reason"])])
+    fresh &= ~keys.duplicated()
+    df, keys = df[fresh], keys[fresh]
+    if df.empty:
+        logger.info(f"All rejected rows for run {run_id} are already quarantined — nothing to write.")
+        return 0
+
+    month = month or datetime.utcnow().strftime("%Y-%m")
+    path = os.path.join(quarantine_dir, f"month={month}", f"{run_id}-{uuid.uuid4().hex[:8]}.parquet")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path, index=False, compression="zstd")
+
+    entries = df.groupby(["run_id", "ticker", "rejection_reason"]).size().rename("rows").reset_index()
+    add_quarantine_index(entries.rename(columns={"rejection_reason": "reason"}).assign(path=path), keys)
+    logger.info(f"Quarantined {len(df)} rejected rows for run {run_id} → {path}")
+    return len(df)
+
+
+def load_quarantine(run_id: str = None, ticker: str = None, reason: str = None) -> pd.DataFrame:
+    """Load quarantined rows matching every given filter, reading only the files the index points to."""
+    filters = [(col, "=", value) for col, value in
+               (("run_id", run_id), ("ticker", ticker), ("rejection_reason", reason)) if value]
+    paths = find_quarantine_files(run_id, ticker, reason)
+    frames = [_drop_indexed_sources(pd.read_parquet(path, filters=filters or None), paths) for path in paths]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)[COLUMNS]
+
+
+def compact_quarantine(quarantine_dir: str = QUARANTINE_DIR) -> int:
+    """
+    Merge the indexed per-run files of every closed month into the month's compacted.parquet.
+    The current month is left alone since runs are still appending to it.
+    Safe to rerun after a crash at any step: the compacted file is swapped in atomically,
+    rows of sources still in the index are replaced rather than duplicated, and readers
+    ignore compacted rows whose source file is still indexed.
+    Returns the number of files merged away.
+    """
+    current = f"month={datetime.utcnow().strftime('%Y-%m')}"
+    indexed = set(find_quarantine_files())
+    merged = 0
+    for month_dir in sorted(glob.glob(os.path.join(quarantine_dir, "month=*"))):
+        if os.path.basename(month_dir) >= current:
+            continue
+        path = os.path.join(month_dir, COMPACTED)
+        compacted = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame(columns=COLUMNS + ["source_file"])
+        files = sorted(f for f in glob.glob(os.path.join(month_dir, "*.parquet")) if f != path)
+        # Unindexed files are either sources already merged by an interrupted run, or saves
+        # that crashed before being indexed; only the former are safe to clean up
+        leftovers = [f for f in files if f not in indexed and f in set(compacted["source_file"])]
+        sources = [f for f in files if f in indexed]
+        if not sources and not leftovers:
+            continue
+
+        if sources:
+            frames = [compacted[~compacted["source_file"].isin(sources)]]
+            frames += [pd.read_parquet(f).assign(source_file=f) for f in sources]
+            df = pd.concat(frames, ignore_index=True).sort_values(["ticker", "rejection_reason", "run_id", "date"])
+            df.to_parquet(path + ".tmp", index=False, compression="zstd")
+            os.replace(path + ".tmp", path)
+            # Readers go through the index, so repoint it before removing the sources
+            repoint_quarantine_index(sources, path)
+
+        for f in sources + leftovers:
+            os.remove(f)
+        merged += len(sources)
+        logger.info(f"Compacted {len(sources)} quarantine files in {month_dir}")
+    return merged
+
+
+def import_rejected_csvs(log_dir: str = LOG_DIR, quarantine_dir: str = QUARANTINE_DIR) -> int:
+    """
+    Move legacy logs/rejected_<run>.csv dumps into the quarantine store, each under the month
+    of its run so closed months get compacted. A file that fails to import is logged and left
+    in place for the next run. Returns files imported.
+    """
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(log_dir, "rejected_*.csv"))):
+        run_id = os.path.basename(path).removeprefix("rejected_").removesuffix(".csv")
+        try:
+            save_quarantine(pd.read_csv(path), run_id, quarantine_dir, month=_run_month(run_id))
+            os.remove(path)
+            imported += 1
+        except Exception as e:
+            logger.error(f"Could not import legacy rejected CSV {path}: {e}")
+    if imported:
+        logger.info(f"Imported {imported} legacy rejected CSV(s) into the quarantine store")
+    return imported
+
+
+def _run_month(run_id: str) -> str:
+    # Pipeline run ids are YYYYMMDD_HHMMSS; anything else lands in the current month
+    try:
+        return datetime.strptime(run_id, "%Y%m%d_%H%M%S").strftime("%Y-%m")
+    except ValueError:
+        return datetime.utcnow().strftime("%Y-%m")
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    # Fixed column set and dtypes so files from different runs concatenate cleanly
+    df = df.reindex(columns=COLUMNS)
+    df["date"] = pd.to_datetime(df["date"])
+    df["quarantined_at"] = pd.to_datetime(df["quarantined_at"])
+    for col in ["open", "high", "low", "close", "volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    df["rejection_reason"] = df["rejection_reason"].str.strip()
+    return df
+
+
+def _drop_indexed_sources(df: pd.DataFrame, paths: list) -> pd.DataFrame:
+    # Compacted rows whose source file is still indexed are read from that file instead
+    if "source_file" in df.columns:
+        df = df[~df["source_file"].isin(paths)]
+    return df
@@ -1,11 +1,20 @@
 import pytest
 import pandas as pd
+import numpy as np
 import sys, os
+from datetime import date, timedelta
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from processing.cleaner import clean
 from processing.validator import validate
 from processing.transformer import transform
+from processing.cross_section import RollingCorrelation, update_cross_section, load_correlation
+from ingestion.backfill import plan_windows, run_backfill
+from sqlalchemy import create_engine
+import storage.db as db
+from storage.archive import archive_raw, read_archive
+from storage.quarantine import save_quarantine, load_quarantine, compact_quarantine, import_rejected_csvs
+import main
 
 
 # ── Fixtures ────────────────────────────────────────────────
@@ -24,6 +33,24 @@ def sample_df():
     })
 
 
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "engine", create_engine(f"sqlite:///{tmp_path / 'test.db'}"))
+    db.init_db()
+    return db
+
+
+@pytest.fixture
+def processed_df(sample_df):
+    df = sample_df.copy()
+    df["ma_7"] = df["close"]
+    df["ma_30"] = df["close"]
+    df["daily_pct_change"] = 0.0
+    df["volatility_7d"] = 0.0
+    df["above_ma30"] = 0
+    return df
+
+
 # ── Cleaner Tests ────────────────────────────────────────────
 
 def test_clean_removes_duplicates(sample_df):
@@ -110,3 +137,477 @@ def test_transform_adds_volatility(sample_df):
 def test_transform_above_ma30_is_binary(sample_df):
     result = transform(sample_df)
     assert set(result["above_ma30"].unique()).issubset({0, 1})
+
+
+# ── Storage Tests ────────────────────────────────────────────
+
+def test_save_processed_sets_ticker_version(temp_db, processed_df):
+    assert temp_db.get_ticker_versions() == {}
+    temp_db.save_processed(processed_df)
+    assert temp_db.get_ticker_versions() == {"AAPL": 1}
+
+
+def test_ticker_version_unchanged_on_duplicate_save(temp_db, processed_df):
+    temp_db.save_processed(processed_df)
+    temp_db.save_processed(processed_df)
+    assert temp_db.get_ticker_versions() == {"AAPL": 1}
+
+
+def test_ticker_version_bumped_only_for_changed_ticker(temp_db, processed_df):
+    other = processed_df.assign(ticker="MSFT")
+    temp_db.save_processed(pd.concat([processed_df, other], ignore_index=True))
+    new_row = other.iloc[[-1]].assign(date=pd.Timestamp("2024-01-04"))
+    temp_db.save_processed(new_row)
+    assert temp_db.get_ticker_versions() == {"AAPL": 1, "MSFT": 2}
+
+
+def test_save_processed_rows_and_version_commit_together(temp_db, processed_df, monkeypatch):
+    def crash(conn, tickers):
+        raise RuntimeError("crash before the version bump")
+
+    monkeypatch.setattr(temp_db, "_bump_versions", crash)
+    with pytest.raises(RuntimeError):
+        temp_db.save_processed(processed_df)
+    # Neither the rows nor a version were committed, so a retry is not hidden behind a stale version
+    assert temp_db.load_processed().empty
+    assert temp_db.get_ticker_versions() == {}
+
+
+def test_init_db_seeds_versions_only_once(temp_db, processed_df):
+    # Rows written before version tracking existed get a version on the next init_db
+    temp_db._upsert(processed_df[["date", "ticker", "close"]], "processed_stocks")
+    temp_db.init_db()
+    assert temp_db.get_ticker_versions() == {"AAPL": 1}
+
+    # Once seeded, init_db no longer scans processed_stocks
+    temp_db._upsert(processed_df[["date", "ticker", "close"]].assign(ticker="MSFT"), "processed_stocks")
+    temp_db.init_db()
+    assert temp_db.get_ticker_versions() == {"AAPL": 1}
+
+
+# ── Backfill Tests ───────────────────────────────────────────
+
+def synthetic_fetch(ticker, start, end):
+    dates = pd.bdate_range(start, end, inclusive="left")
+    # Price depends only on the date so overlapping windows agree
+    close = [100.0 + (d - pd.Timestamp("2020-01-01")).days for d in dates]
+    return pd.DataFrame({
+        "date": dates, "ticker": ticker,
+        "open": close, "high": [c + 1 for c in close], "low": [c - 1 for c in close],
+        "close": close, "volume": 1000, "fetched_at": pd.Timestamp.utcnow(),
+    })
+
+
+def test_plan_windows_covers_range_without_gaps():
+    windows = plan_windows(date(2024, 1, 1), years=2, window_days=100)
+    assert windows[0][0] <= date(2022, 1, 1) < windows[0][1]
+    assert windows[-1][1] == date(2024, 1, 1)
+    assert all(a[1] == b[0] for a, b in zip(windows, windows[1:]))
+
+
+def test_plan_windows_stable_across_days():
+    today = plan_windows(date(2024, 1, 1), years=2, window_days=100)
+    tomorrow = plan_windows(date(2024, 1, 2), years=2, window_days=100)
+    assert [s for s, _ in today] == [s for s, _ in tomorrow]
+    assert today[:-1] == tomorrow[:-1]
+
+
+def test_backfill_resumes_after_failure(temp_db):
+    end = date(2024, 1, 1)
+    calls = []
+
+    def flaky_fetch(ticker, start, end):
+        calls.append(ticker)
+        if ticker == "BAD":
+            raise ConnectionError("boom")
+        return synthetic_fetch(ticker, start, end)
+
+    first = run_backfill(["AAPL", "BAD"], years=1, window_days=100, max_workers=2, fetch=flaky_fetch, end=end)
+    assert first["failed"] == first["done"] > 0
+    assert set(temp_db.load_backfill_checkpoints("failed")["ticker"]) == {"BAD"}
+
+    calls.clear()
+    second = run_backfill(["AAPL", "BAD"], years=1, window_days=100,
+                          fetch=lambda t, s, e: calls.append(t) or synthetic_fetch(t, s, e), end=end)
+    assert second["done"] == first["failed"] and second["failed"] == 0
+    assert calls == ["BAD"] * first["failed"]  # only the failed units were fetched again
+    assert temp_db.load_backfill_checkpoints("pending").empty
+
+
+def test_backfill_resumes_on_a_later_day(temp_db):
+    calls = []
+
+    def fetch(ticker, start, end):
+        calls.append(start)
+        if len(calls) > 2:
+            raise ConnectionError("crash")
+        return synthetic_fetch(ticker, start, end)
+
+    first = run_backfill(["AAPL"], years=1, window_days=100, max_workers=1, fetch=fetch, end=date(2024, 1, 1))
+    assert first["done"] == 2 and first["failed"] > 0
+    failed = set(temp_db.load_backfill_checkpoints("failed")["window_start"])
+
+    calls.clear()
+    second = run_backfill(["AAPL"], years=1, window_days=100, max_workers=1,
+                          fetch=lambda t, s, e: calls.append(s) or synthetic_fetch(t, s, e), end=date(2024, 1, 2))
+    # Only the failed units run again (the newest window is among them); finished units are skipped
+    assert second == {"done": len(failed), "failed": 0, "rows": second["rows"]}
+    assert {(s + timedelta(days=60)).isoformat() for s in calls} == failed
+    assert set(temp_db.load_backfill_checkpoints()["status"]) == {"done"}
+
+
+def test_backfill_rerun_next_day_only_extends_newest_window(temp_db):
+    run_backfill(["AAPL"], years=1, window_days=100, fetch=synthetic_fetch, end=date(2024, 1, 1))
+    calls = []
+    second = run_backfill(["AAPL"], years=1, window_days=100,
+                          fetch=lambda t, s, e: calls.append((s, e)) or synthetic_fetch(t, s, e), end=date(2024, 1, 2))
+    newest_start, newest_end = plan_windows(date(2024, 1, 2), years=1, window_days=100)[-1]
+    assert second["done"] == 1
+    assert calls == [(newest_start - timedelta(days=60), newest_end)]
+
+
+def test_backfill_interrupt_keeps_progress_and_skips_queued_units(temp_db, monkeypatch):
+    import threading
+    import ingestion.backfill as backfill
+    calls = []
+    third_started, release = threading.Event(), threading.Event()
+
+    def fetch(ticker, start, end):
+        calls.append(start)
+        if len(calls) == 3:
+            third_started.set()
+            release.wait(5)
+        return synthetic_fetch(ticker, start, end)
+
+    real_as_completed = backfill.as_completed
+
+    def interrupted_as_completed(futures):
+        for i, future in enumerate(real_as_completed(futures)):
+            yield future
+            if i == 1:
+                # Ctrl+C arrives while the third unit is still running
+                third_started.wait(5)
+                threading.Timer(0.1, release.set).start()
+                raise KeyboardInterrupt
+
+    monkeypatch.setattr(backfill, "as_completed", interrupted_as_completed)
+    with pytest.raises(KeyboardInterrupt):
+        run_backfill(["AAPL"], years=2, window_days=100, max_workers=1, fetch=fetch, end=date(2024, 1, 1))
+
+    checkpoints = temp_db.load_backfill_checkpoints()
+    assert len(calls) == 3  # queued units were cancelled, never fetched
+    assert (checkpoints["status"] == "done").sum() == 3  # including the one in flight
+    assert (checkpoints["status"] == "pending").sum() == len(checkpoints) - 3
+
+
+class FakeTicker:
+    """Mimics yf.Ticker.history: errors only surface with raise_errors=True."""
+    def __init__(self, error):
+        self.error = error
+
+    def history(self, raise_errors=False, **kwargs):
+        if raise_errors:
+            raise self.error
+        return pd.DataFrame()
+
+
+def test_backfill_retries_window_when_fetch_errors(temp_db, monkeypatch):
+    import ingestion.fetcher as fetcher
+    monkeypatch.setattr(fetcher.yf, "Ticker", lambda t: FakeTicker(ConnectionError("rate limited")))
+    with pytest.raises(ConnectionError):
+        fetcher.fetch_stock_range("AAPL", date(2023, 1, 1), date(2023, 2, 1))
+
+    summary = run_backfill(["AAPL"], years=1, window_days=100, fetch=fetcher.fetch_stock_range, end=date(2024, 1, 1))
+    assert summary["done"] == 0 and summary["failed"] > 0
+    assert temp_db.load_backfill_checkpoints("done").empty
+
+
+def test_fetch_range_empty_window_is_not_an_error(monkeypatch):
+    import ingestion.fetcher as fetcher
+    from yfinance.exceptions import YFPricesMissingError
+    monkeypatch.setattr(fetcher.yf, "Ticker", lambda t: FakeTicker(YFPricesMissingError(t, "")))
+    assert fetcher.fetch_stock_range("AAPL", date(1990, 1, 1), date(1990, 2, 1)).empty
+
+
+def test_backfill_windows_match_single_run_features(temp_db):
+    end = date(2024, 1, 1)
+    run_backfill(["AAPL"], years=1, window_days=30, fetch=synthetic_fetch, end=end)
+    backfilled = temp_db.load_processed("AAPL")
+    first_day = pd.Timestamp(plan_windows(end, years=1, window_days=30)[0][0])
+    full = transform(clean(synthetic_fetch("AAPL", first_day - pd.Timedelta(days=60), end)))
+    full = full[full["date"] >= first_day].reset_index(drop=True)
+    assert len(backfilled) == len(full)
+    assert backfilled["ma_30"].round(4).tolist() == full["ma_30"].round(4).tolist()
+
+
+# ── Cross-Section Tests ──────────────────────────────────────
+
+@pytest.fixture
+def returns_df():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2024-01-01", periods=40)
+    df = pd.DataFrame(rng.normal(0, 0.01, (40, 4)), index=dates, columns=["A", "B", "C", "D"])
+    df["B"] = df["A"] * 0.5 + df["B"]
+    df.iloc[:10, 3] = np.nan  # D lists late
+    return df
+
+
+def test_rolling_correlation_matches_full_recompute(returns_df):
+    state = RollingCorrelation(window=25)
+    for start in range(0, 40, 7):  # arrive in uneven batches
+        state.update(returns_df.iloc[start:start + 7])
+    expected = returns_df.iloc[-25:].corr(min_periods=5)
+    np.testing.assert_allclose(state.correlation(min_periods=5).values, expected.values, atol=1e-9)
+
+
+def test_rolling_correlation_patches_late_ticker(returns_df):
+    state = RollingCorrelation(window=25)
+    state.update(returns_df[["A", "B", "C"]])
+    state.update(returns_df[["D"]])  # new ticker with history inside the window
+    expected = returns_df.iloc[-25:].corr(min_periods=5)
+    np.testing.assert_allclose(state.correlation(min_periods=5).values, expected.values, atol=1e-9)
+
+
+def test_rolling_correlation_roundtrips_bytes(returns_df):
+    state = RollingCorrelation(window=25)
+    state.update(returns_df)
+    restored = RollingCorrelation.from_bytes(state.to_bytes())
+    assert restored.tickers == state.tickers and restored.dates == state.dates
+    pd.testing.assert_frame_equal(restored.correlation(), state.correlation())
+
+
+def test_update_cross_section_stores_results(temp_db, returns_df):
+    long_df = returns_df.mul(100).stack().rename("daily_pct_change").reset_index()
+    long_df.columns = ["date", "ticker", "daily_pct_change"]
+    strength = update_cross_section(long_df)
+    assert set(strength["ticker"]) == {"A", "B", "C", "D"}
+    assert strength["rs_rank"].between(0, 100).all()
+    assert load_correlation().shape == (4, 4)
+    assert len(temp_db.load_relative_strength()) == 4
+
+
+def test_cross_section_version_bumps_on_late_data_patch(temp_db, returns_df):
+    import processing.cross_section as cross_section
+    long_df = returns_df.mul(100).stack().rename("daily_pct_change").reset_index()
+    long_df.columns = ["date", "ticker", "daily_pct_change"]
+    update_cross_section(long_df)
+    before = temp_db.get_analytics_version(cross_section.STATE_KEY)
+
+    # A corrected return for a date already in the window adds no processed rows,
+    # but changes the analytics — the dashboard's cache key must move with it
+    patch = long_df.tail(1).assign(daily_pct_change=5.0)
+    update_cross_section(patch)
+    assert temp_db.get_analytics_version(cross_section.STATE_KEY) == before + 1
+
+
+def test_refresh_cross_section_logs_failure(temp_db, returns_df, monkeypatch):
+    import processing.cross_section as cross_section
+    monkeypatch.setattr(cross_section, "swap_analytics", lambda *args: False)
+    long_df = returns_df.mul(100).stack().rename("daily_pct_change").reset_index()
+    long_df.columns = ["date", "ticker", "daily_pct_change"]
+    with pytest.raises(RuntimeError):
+        update_cross_section(long_df)
+    assert cross_section.refresh_cross_section(long_df) is False
+
+
+def test_pipeline_saves_processed_rows_when_cross_section_fails(temp_db, workdir, sample_df, monkeypatch):
+    import processing.cross_section as cross_section
+    monkeypatch.setattr(main, "fetch_all_stocks", lambda: sample_df)
+    monkeypatch.setattr(cross_section, "swap_analytics", lambda *args: False)
+    main.run_pipeline()
+    assert len(temp_db.load_processed("AAPL")) == len(sample_df)
+    assert temp_db.get_ticker_versions() == {"AAPL": 1}
+
+
+def test_update_cross_section_retries_on_concurrent_write(temp_db, returns_df, monkeypatch):
+    import processing.cross_section as cross_section
+    long_df = returns_df.mul(100).stack().rename("daily_pct_change").reset_index()
+    long_df.columns = ["date", "ticker", "daily_pct_change"]
+    ours, theirs = long_df[long_df["ticker"].isin(["A", "B"])], long_df[long_df["ticker"].isin(["C", "D"])]
+
+    real_swap = cross_section.swap_analytics
+    attempts = []
+
+    def racing_swap(*args):
+        attempts.append(args[2])
+        if len(attempts) == 1:
+            update_cross_section(theirs)  # another writer commits between our read and our write
+        return real_swap(*args)
+
+    monkeypatch.setattr(cross_section, "swap_analytics", racing_swap)
+    update_cross_section(ours)
+
+    # Our first swap lost the race and was retried against the newer version
+    assert attempts[0] == 0 and attempts[-1] > 0
+    payload, _ = temp_db.load_analytics_version(cross_section.STATE_KEY)
+    state = RollingCorrelation.from_bytes(payload)
+    assert sorted(state.tickers) == ["A", "B", "C", "D"]
+    assert load_correlation().shape == (4, 4)
+
+
+# ── Retention Tests ──────────────────────────────────────────
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Archive and quarantine paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_archive_moves_old_raw_bars_and_reads_back(temp_db, workdir, sample_df):
+    recent = sample_df.assign(date=pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=3))
+    temp_db.save_raw(pd.concat([sample_df, recent], ignore_index=True))
+
+    assert archive_raw(retention_days=30) == 3
+    assert len(temp_db.load_raw(include_archive=False)) == 3
+    assert len(read_archive()) == 3
+    history = temp_db.load_raw("AAPL")
+    assert len(history) == 6 and history["date"].is_monotonic_increasing
+    assert len(temp_db.load_raw(since=pd.Timestamp("2024-01-02"), until=pd.Timestamp("2024-01-03"))) == 1
+
+    # Re-archiving the same bars merges into the partition without duplicates
+    temp_db.save_raw(sample_df)
+    archive_raw(retention_days=30)
+    assert len(read_archive()) == 3
+
+
+def test_archive_keeps_old_bars_written_during_the_run(temp_db, workdir, sample_df, monkeypatch):
+    import storage.archive as archive
+    temp_db.save_raw(sample_df.iloc[:2])
+    late_bar = sample_df.iloc[[2]]
+
+    def load_then_concurrent_write(**kwargs):
+        df = temp_db.load_raw(**kwargs)
+        temp_db.save_raw(late_bar)  # e.g. a backfill writing an old bar mid-archive
+        return df
+
+    monkeypatch.setattr(archive, "load_raw", load_then_concurrent_write)
+    assert archive_raw(retention_days=30) == 2
+    hot = temp_db.load_raw(include_archive=False)
+    assert hot["date"].tolist() == [pd.Timestamp("2024-01-03")]
+    assert len(temp_db.load_raw()) == 3
+
+
+def test_quarantine_indexed_by_run_ticker_and_reason(temp_db, workdir, sample_df):
+    sample_df.loc[0, "close"] = -1.0
+    sample_df.loc[1, "volume"] = 0
+    _, rejected = validate(sample_df)
+    assert save_quarantine(rejected, "run1") == 3  # row 0 fails two rules
+    save_quarantine(rejected.assign(ticker="MSFT"), "run2")
+
+    assert len(load_quarantine()) == 6
+    assert len(load_quarantine(run_id="run1")) == 3
+    assert set(load_quarantine(ticker="MSFT")["run_id"]) == {"run2"}
+    zero_volume = load_quarantine(reason="volume is zero or negative")
+    assert len(zero_volume) == 2
+
+
+def test_quarantine_skips_records_already_stored(temp_db, workdir, sample_df):
+    sample_df.loc[0, "close"] = -1.0
+    _, rejected = validate(sample_df)
+    assert save_quarantine(rejected, "run1") == 2
+    # The next run re-fetches the same bad bar: nothing new, no new file
+    assert save_quarantine(rejected, "run2") == 0
+    assert len(list((workdir / "data" / "quarantine").rglob("*.parquet"))) == 1
+
+    # Only the new (ticker, date, reason) rows of a partly seen batch are stored
+    sample_df.loc[1, "volume"] = 0
+    _, rejected = validate(sample_df)
+    assert save_quarantine(rejected, "run3") == 1
+    assert len(load_quarantine()) == 3
+    assert load_quarantine(run_id="run3")["rejection_reason"].tolist() == ["volume is zero or negative"]
+
+
+def _quarantine_closed_month(temp_db, workdir, sample_df, runs=("run1", "run2")):
+    sample_df.loc[0, "close"] = -1.0
+    _, rejected = validate(sample_df)
+    for run_id, ticker in zip(runs, ("AAPL", "MSFT")):
+        save_quarantine(rejected.assign(ticker=ticker), run_id)
+    # Pretend the saves happened in a closed month
+    month_dir = next((workdir / "data" / "quarantine").iterdir())
+    old_dir = month_dir.with_name("month=2000-01")
+    month_dir.rename(old_dir)
+    with temp_db.engine.connect() as conn:
+        conn.execute(db.text("UPDATE quarantine_index SET path = REPLACE(path, :new, :old)"),
+                     {"new": month_dir.name, "old": old_dir.name})
+        conn.commit()
+    return old_dir
+
+
+def test_compact_quarantine_keeps_records_queryable(temp_db, workdir, sample_df):
+    old_dir = _quarantine_closed_month(temp_db, workdir, sample_df)
+    assert compact_quarantine() == 2
+    assert [f.name for f in old_dir.iterdir()] == ["compacted.parquet"]
+    assert len(load_quarantine(run_id="run2")) == len(load_quarantine()) // 2
+
+    # A later round merges new files into the same compacted file
+    save_quarantine(load_quarantine(run_id="run1").drop(columns="run_id").assign(ticker="GOOG"),
+                    "run3", "data/quarantine")
+    new_file = next(f for f in (workdir / "data" / "quarantine").rglob("run3-*.parquet"))
+    new_file.rename(old_dir / new_file.name)
+    with temp_db.engine.connect() as conn:
+        conn.execute(db.text("UPDATE quarantine_index SET path = :new WHERE run_id = 'run3'"),
+                     {"new": str(old_dir.relative_to(workdir) / new_file.name)})
+        conn.commit()
+    assert compact_quarantine() == 1
+    assert len(load_quarantine()) == 6
+
+
+@pytest.mark.parametrize("crash_point", ["repoint", "remove"])
+def test_compact_quarantine_recovers_from_crash(temp_db, workdir, sample_df, monkeypatch, crash_point):
+    import storage.quarantine as quarantine
+    old_dir = _quarantine_closed_month(temp_db, workdir, sample_df)
+    expected = load_quarantine().sort_values(["run_id", "rejection_reason"]).reset_index(drop=True)
+
+    def crash(*args):
+        raise RuntimeError("crash")
+
+    real_repoint, real_remove = quarantine.repoint_quarantine_index, os.remove
+    if crash_point == "repoint":
+        monkeypatch.setattr(quarantine, "repoint_quarantine_index", crash)
+    else:
+        removed = []
+        monkeypatch.setattr(quarantine.os, "remove", lambda f: crash() if removed else removed.append(real_remove(f)))
+    with pytest.raises(RuntimeError):
+        compact_quarantine()
+    monkeypatch.setattr(quarantine, "repoint_quarantine_index", real_repoint)
+    monkeypatch.setattr(quarantine.os, "remove", real_remove)
+
+    # Reads stay correct in the crashed state, and a rerun neither loses nor duplicates records
+    assert len(load_quarantine()) == len(expected)
+    compact_quarantine()
+    result = load_quarantine().sort_values(["run_id", "rejection_reason"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
+    assert [f.name for f in old_dir.iterdir()] == ["compacted.parquet"]
+
+
+def test_import_rejected_csvs(temp_db, workdir, sample_df):
+    sample_df.loc[0, "close"] = -1.0
+    _, rejected = validate(sample_df)
+    (workdir / "logs").mkdir()
+    rejected.to_csv(workdir / "logs" / "rejected_20240101_000000.csv", index=False)
+    (workdir / "logs" / "rejected_20240102_000000.csv").write_text("not,a\nrejects,dump\n")
+
+    # The bad dump is skipped and kept for a later look; the good one lands in its run's month
+    assert import_rejected_csvs() == 1
+    assert [f.name for f in (workdir / "logs").glob("rejected_*.csv")] == ["rejected_20240102_000000.csv"]
+    assert len(load_quarantine(run_id="20240101_000000")) == 2
+    assert list((workdir / "data" / "quarantine" / "month=2024-01").glob("20240101_000000-*.parquet"))
+
+
+def test_maintenance_steps_run_independently(temp_db, monkeypatch):
+    ran = []
+
+    def archive_raw():
+        raise RuntimeError("archive disk full")
+
+    monkeypatch.setattr(main, "archive_raw", archive_raw)
+    for name in ("import_rejected_csvs", "compact_quarantine", "vacuum_analyze"):
+        monkeypatch.setattr(main, name, lambda name=name: ran.append(name))
+
+    assert main.run_maintenance() == ["archive_raw"]
+    assert ran == ["import_rejected_csvs", "compact_quarantine", "vacuum_analyze"]
+
+
+def test_vacuum_analyze_runs(temp_db):
+    temp_db.vacuum_analyze()